@@ -1,48 +1,230 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
-import json
+import string
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from cachetools import LRUCache, TTLCache
+from capitals import CAPITAL_DATABASE, CAPITALS_VERSION, fold_name
 
 app = Flask(__name__)
 
+# Longest we'll sleep on a Retry-After header, whatever Wikidata asks for
+RETRY_AFTER_MAX = 5
+
+class CappedRetry(Retry):
+    """Retry that honours Retry-After, but never waits longer than RETRY_AFTER_MAX."""
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, RETRY_AFTER_MAX)
+
+# Shared HTTP session so keep-alive reuses connections to Wikidata across claims
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    # Back off briefly on rate limiting and transient errors; worst case a
+    # lookup waits a few seconds rather than holding a worker thread
+    max_retries=CappedRetry(
+        total=2,
+        backoff_factor=0.3,
+        backoff_max=2,
+        status_forcelist=[429, 502, 503, 504],
+        respect_retry_after_header=True,
+        allowed_methods=["GET"],
+        # Hand the final 429/5xx back so the status code branches still run
+        raise_on_status=False
+    )
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+SESSION.headers.update({"User-Agent": "FactCheckerMCP/1.0"})
+
+# Session without retries, for lookups that can fall back to a last known
+# capital: serving it at once beats waiting out backoff on a struggling Wikidata
+FAIL_FAST_SESSION = requests.Session()
+_fail_fast_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+FAIL_FAST_SESSION.mount("http://", _fail_fast_adapter)
+FAIL_FAST_SESSION.mount("https://", _fail_fast_adapter)
+FAIL_FAST_SESSION.headers.update(SESSION.headers)
+
+WIKIDATA_SPARQL_URL = "https://query.wikidata.org/sparql"
+
+# (connect, read) timeouts in seconds for every Wikidata request
+WIKIDATA_TIMEOUT = (3.05, 10)
+
+# Largest batch accepted by /fact-check/batch, keeping the VALUES query within URL limits
+MAX_BATCH_CLAIMS = 50
+# Concurrent fallback searches for batch countries the VALUES query didn't resolve
+BATCH_FALLBACK_WORKERS = 8
+
+# Lookup tables are built once and exposed read-only; keys are case-folded
+COUNTRY_MAPPING = MappingProxyType({
+    "united states": "United States of America",
+    "us": "United States of America",
+    "usa": "United States of America",
+    "uk": "United Kingdom",
+    "great britain": "United Kingdom",
+    "south korea": "Republic of Korea",
+    "north korea": "Democratic People's Republic of Korea"
+})
+
+CAPITAL_MAPPING = MappingProxyType({
+    "washington": "Washington, D.C.",
+    "washington dc": "Washington, D.C.",
+    "washington d.c.": "Washington, D.C.",
+    "new york": "New York City"
+})
+
+# Every supported claim type as one alternative, wrapped in a named group so
+# match.lastgroup says which one matched. Add more claim types here.
+# Example: "The capital of France is London"
+# Names are length-bounded and must end in a letter (or the final dot of an
+# abbreviation like "D.C."), so they can't trade characters with the
+# surrounding whitespace and the optional terminator; that keeps matching
+# linear instead of backtracking over every split of "... is ... is ...".
+# Letters are any Unicode letter ([^\W\d_]), and names may also contain
+# apostrophes, hyphens and dots: "Bogotá", "Port-au-Prince", "St. John's".
+CLAIM_RE = re.compile(
+    r"(?P<capital_claim>the capital of\s+"
+    r"(?P<country>[^\W\d_](?:[\w\s'’.-]{0,58}[^\W\d_])?)\s+is\s+"
+    r"(?P<capital>[^\W\d_](?:[\w\s'’,.-]{0,78}(?:[^\W\d_]|(?<=\.[^\W\d_])\.))?))"
+    r"[.!?]?\s*\Z",
+    re.IGNORECASE
+)
+
+# Longer input is rejected before matching; no supported claim comes close
+MAX_CLAIM_LENGTH = 300
+
+# Verification function for each named claim type in CLAIM_RE
+CLAIM_HANDLERS = {
+    "capital_claim": lambda match: check_capital_claim(match.group("country").strip(), match.group("capital").strip())
+}
+
+# Capitals fetched from Wikidata rarely change, so keep them for a day.
+# Keys are normalized, case-folded country names; values are the capital.
+# Claims are compared against it on every hit rather than caching verdicts.
+CAPITAL_CACHE_TTL = 86400
+CAPITAL_CACHE = TTLCache(maxsize=4096, ttl=CAPITAL_CACHE_TTL)
+# Last capital successfully fetched per country. Unlike CAPITAL_CACHE this
+# never expires, so it can answer while Wikidata is failing or rate limiting.
+LAST_KNOWN_CAPITALS = LRUCache(maxsize=4096)
+STALE_CONFIDENCE = 0.7
+CACHE_LOCK = threading.RLock()
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+# Only verdicts at least this confident are marked cacheable over HTTP
+CACHEABLE_CONFIDENCE = 0.9
+
+def ojson(obj, status=200):
+    """Build a JSON response serialized with orjson."""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+def format_mcp_payload(claim, result):
+    """Wrap a fact check result in an MCP payload."""
+    payload = {
+        "version": "1.0",
+        "context": {
+            "type": "fact_check",
+            "claim": claim,
+            "correct_answer": result["correct_answer"],
+            "confidence": result["confidence"]
+        }
+    }
+    if result.get("cached"):
+        payload["context"]["cached"] = True
+    return payload
+
 @app.route('/fact-check', methods=['POST'])
 def fact_check():
     data = request.json
     if not data or 'claim' not in data:
-        return jsonify({"error": "Missing claim in request"}), 400
+        return ojson({"error": "Missing claim in request"}, 400)
     
     claim = data['claim']
+    
+    # Claims answered from the local table only depend on the claim text and
+    # the table, so clients holding that answer can revalidate without a
+    # lookup. Wildcard If-None-Match is ignored; it would match any claim.
+    revalidatable = is_local_claim(claim)
+    etag = hashlib.blake2b(f"{CAPITALS_VERSION}:{claim}".encode(), digest_size=8).hexdigest()
+    if revalidatable and not request.if_none_match.star_tag and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
     result = check_fact(claim)
     
     # Format as MCP payload
-    mcp_payload = {
-        "version": "1.0",
-        "context": {
-            "type": "fact_check",
-            "claim": claim,
-            "correct_answer": result["correct_answer"],
-            "confidence": result["confidence"]
-        }
-    }
+    mcp_payload = format_mcp_payload(claim, result)
+    
+    response = ojson(mcp_payload)
+    if result["confidence"] >= CACHEABLE_CONFIDENCE:
+        if revalidatable:
+            response.set_etag(etag)
+        response.headers["Cache-Control"] = f"public, max-age={CAPITAL_CACHE_TTL}"
+    return response
+
+@app.route('/fact-check/batch', methods=['POST'])
+def fact_check_batch():
+    data = request.json
+    if not isinstance(data, dict) or not isinstance(data.get('claims'), list):
+        return ojson({"error": "Missing claims list in request"}, 400)
+    
+    claims = data['claims']
+    if len(claims) > MAX_BATCH_CLAIMS:
+        return ojson({"error": f"At most {MAX_BATCH_CLAIMS} claims per batch"}, 400)
+    results = check_facts_batch(claims)
     
-    return jsonify(mcp_payload)
+    # One MCP payload per claim, in request order
+    return ojson([format_mcp_payload(claim, result) for claim, result in zip(claims, results)])
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    with CACHE_LOCK:
+        return ojson({
+            "hits": CACHE_STATS["hits"],
+            "misses": CACHE_STATS["misses"],
+            "size": len(CAPITAL_CACHE)
+        })
+
+def match_claim(claim):
+    """Match the claim against CLAIM_RE, or return None if it's too long to be one."""
+    if len(claim) > MAX_CLAIM_LENGTH:
+        return None
+    return CLAIM_RE.match(claim)
+
+def parse_capital_claim(claim):
+    """Return (country, claimed_capital) if the claim is about a capital, else None."""
+    match = match_claim(claim)
+    if match and match.lastgroup == "capital_claim":
+        return match.group("country").strip(), match.group("capital").strip()
+    return None
+
+def in_local_database(country):
+    """Return True if the country's capital is in the bundled capitals table."""
+    return fold_name(normalize_country_name(country)) in CAPITAL_DATABASE or fold_name(country) in CAPITAL_DATABASE
+
+def is_local_claim(claim):
+    """Return True if the claim is answered from the local table, without Wikidata."""
+    parsed = parse_capital_claim(claim)
+    return parsed is not None and in_local_database(parsed[0])
 
 def check_fact(claim):
     """
     Parse the claim and check it against Wikidata or other knowledge sources.
     Returns a dict with correct_answer and confidence.
     """
-    # Simple pattern matching for common claim types
-    # Example: "The capital of France is London"
-    capital_pattern = re.compile(r"The capital of ([A-Za-z\s]+) is ([A-Za-z\s,\.]+)", re.IGNORECASE)
-    match = capital_pattern.match(claim)
+    # One scan of the claim against every supported claim type
+    match = match_claim(claim)
     
     if match:
-        country = match.group(1).strip()
-        claimed_capital = match.group(2).strip()
-        return check_capital_claim(country, claimed_capital)
-    
-    # Add more patterns for other types of claims
+        return CLAIM_HANDLERS[match.lastgroup](match)
     
     # Default fallback if no patterns match
     return {
@@ -50,36 +232,36 @@ def check_fact(claim):
         "confidence": 0.0
     }
 
+def check_facts_batch(claims):
+    """
+    Check several claims at once, resolving all capital claims that miss the
+    local database with a single Wikidata query.
+    Returns a list of results in the same order as the claims.
+    """
+    results = [None] * len(claims)
+    pairs = []
+    indices = []
+    
+    for i, claim in enumerate(claims):
+        capital_claim = parse_capital_claim(claim) if isinstance(claim, str) else None
+        if capital_claim:
+            pairs.append(capital_claim)
+            indices.append(i)
+        else:
+            results[i] = {"correct_answer": "Unable to verify this claim", "confidence": 0.0}
+    
+    for i, result in zip(indices, check_capitals_batch(pairs)):
+        results[i] = result
+    
+    return results
+
 def normalize_country_name(country):
     """Normalize country names to improve matching with Wikidata."""
-    country_mapping = {
-        "united states": "United States of America",
-        "us": "United States of America",
-        "usa": "United States of America",
-        "uk": "United Kingdom",
-        "great britain": "United Kingdom",
-        "south korea": "Republic of Korea",
-        "north korea": "Democratic People's Republic of Korea"
-    }
-    
-    normalized = country.lower()
-    if normalized in country_mapping:
-        return country_mapping[normalized]
-    return country
+    return COUNTRY_MAPPING.get(country.casefold(), country)
 
 def normalize_capital_name(capital):
     """Normalize capital names to improve matching."""
-    capital_mapping = {
-        "washington": "Washington, D.C.",
-        "washington dc": "Washington, D.C.",
-        "washington d.c.": "Washington, D.C.",
-        "new york": "New York City"
-    }
-    
-    normalized = capital.lower()
-    if normalized in capital_mapping:
-        return capital_mapping[normalized]
-    return capital
+    return CAPITAL_MAPPING.get(capital.casefold(), capital)
 
 def check_capital_claim(country, claimed_capital):
     """Check if the claimed capital of a country is correct using Wikidata."""
@@ -88,62 +270,55 @@ def check_capital_claim(country, claimed_capital):
         normalized_country = normalize_country_name(country)
         normalized_claimed_capital = normalize_capital_name(claimed_capital)
         
-        # Simple hardcoded database for testing and fallback
-        capital_database = {
-            "france": "Paris",
-            "germany": "Berlin",
-            "japan": "Tokyo",
-            "united states": "Washington, D.C.",
-            "united states of america": "Washington, D.C.",
-            "australia": "Canberra",
-            "brazil": "Brasília",
-            "canada": "Ottawa",
-            "italy": "Rome",
-            "spain": "Madrid",
-            "united kingdom": "London",
-            "china": "Beijing",
-            "russia": "Moscow",
-            "india": "New Delhi",
-            "south korea": "Seoul",
-            "republic of korea": "Seoul"
-        }
+        # Fold each name once for all the comparisons below
+        country_key = fold_name(normalized_country)
+        raw_country_key = fold_name(country)
+        claimed_key = fold_name(normalized_claimed_capital)
         
-        # First try our local database (faster and more reliable for testing)
-        country_key = normalized_country.lower()
-        if country_key not in capital_database:
-            country_key = country.lower()
-            
-        if country_key in capital_database:
-            actual_capital = capital_database[country_key]
-            
-            # Compare with claimed capital
-            if normalized_claimed_capital.lower() == actual_capital.lower() or claimed_capital.lower() == actual_capital.lower():
+        # First try our local database (no network round-trip)
+        capitals = CAPITAL_DATABASE.get(country_key) or CAPITAL_DATABASE.get(raw_country_key)
+        if capitals:
+            # Any of the country's capitals makes the claim correct
+            actual_capital = capitals.get(claimed_key) or capitals.get(fold_name(claimed_capital))
+            if actual_capital:
                 return {"correct_answer": f"Correct. The capital of {country} is {actual_capital}.", "confidence": 0.95}
             else:
-                return {"correct_answer": f"Incorrect. The capital of {country} is {actual_capital}, not {claimed_capital}.", "confidence": 0.95}
+                return {"correct_answer": f"Incorrect. The capital of {country} is {' or '.join(capitals.values())}, not {claimed_capital}.", "confidence": 0.95}
         
-        # If not in our database, try Wikidata as a fallback
+        # Then answers we already fetched from Wikidata
+        cached = lookup_cached_capital(country_key, country, claimed_capital)
+        if cached is not None:
+            return cached
+        
+        # If not in our database, match the country by label on Wikidata.
+        # Binding the label through VALUES lets Wikidata probe its label
+        # index instead of running LCASE over every country label.
+        values = " ".join(f"{sparql_string(label)}@en" for label in country_label_variants(country))
         query = f"""
         SELECT ?capitalLabel WHERE {{
-          ?country wdt:P31 wd:Q6256;  # instance of country
-                  rdfs:label ?countryLabel;
+          VALUES ?countryLabel {{ {values} }}
+          ?country rdfs:label ?countryLabel;
+                  wdt:P31 wd:Q6256;  # instance of country
                   wdt:P36 ?capital.   # capital
           ?capital rdfs:label ?capitalLabel.
-          FILTER(LANG(?countryLabel) = "en")
           FILTER(LANG(?capitalLabel) = "en")
-          FILTER(LCASE(?countryLabel) = LCASE("{normalized_country}") || LCASE(?countryLabel) = LCASE("{country}"))
         }}
         LIMIT 1
         """
         
-        url = "https://query.wikidata.org/sparql"
-        response = requests.get(
+        url = WIKIDATA_SPARQL_URL
+        # Only retry when there's no last known capital to fall back on
+        retry = not has_last_known_capital(country_key)
+        response = wikidata_get(
             url, 
             params={"query": query, "format": "json"},
-            headers={"User-Agent": "FactCheckerMCP/1.0"}
+            retry=retry
         )
         
         if response.status_code != 200:
+            stale = stale_capital_result(country_key, country, claimed_capital)
+            if stale is not None:
+                return stale
             return {"correct_answer": f"Error querying knowledge base: {response.status_code}", "confidence": 0.0}
         
         data = response.json()
@@ -151,45 +326,237 @@ def check_capital_claim(country, claimed_capital):
         
         if not results:
             # Try a more flexible search if the first one fails
-            query = f"""
-            SELECT ?country ?countryLabel ?capitalLabel WHERE {{
-              ?country wdt:P31 wd:Q6256;  # instance of country
-                      wdt:P36 ?capital.   # capital
-              ?capital rdfs:label ?capitalLabel.
-              SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
-              FILTER(CONTAINS(LCASE(?countryLabel), LCASE("{country}")))
-              FILTER(LANG(?capitalLabel) = "en")
-            }}
-            LIMIT 1
-            """
-            
-            response = requests.get(
-                url, 
-                params={"query": query, "format": "json"},
-                headers={"User-Agent": "FactCheckerMCP/1.0"}
-            )
-            
-            if response.status_code != 200:
-                return {"correct_answer": f"Could not find capital information for {country}", "confidence": 0.5}
-                
-            data = response.json()
-            results = data.get("results", {}).get("bindings", [])
-            
-            if not results:
-                return {"correct_answer": f"Could not find capital information for {country}", "confidence": 0.5}
+            return check_capital_by_contains(country_key, country, claimed_capital, retry)
         
         actual_capital = results[0]["capitalLabel"]["value"]
         
-        # Normalize the actual capital for comparison
-        normalized_actual_capital = normalize_capital_name(actual_capital)
+        return cache_capital(country_key, country, claimed_capital, actual_capital)
+            
+    except Exception as e:
+        # Serve the last known capital rather than an error while Wikidata is unavailable
+        stale = stale_capital_result(fold_name(normalize_country_name(country)), country, claimed_capital)
+        if stale is not None:
+            return stale
+        return {"correct_answer": f"Error checking fact: {str(e)}", "confidence": 0.0}
+
+def check_capital_by_contains(country_key, country, claimed_capital, retry=True):
+    """
+    Check the claim against the first country whose label contains the name,
+    for names that aren't an exact Wikidata label. Returns a result dict.
+    """
+    query = f"""
+    SELECT ?country ?countryLabel ?capitalLabel WHERE {{
+      ?country wdt:P31 wd:Q6256;  # instance of country
+              wdt:P36 ?capital.   # capital
+      ?capital rdfs:label ?capitalLabel.
+      SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
+      FILTER(CONTAINS(LCASE(?countryLabel), LCASE({sparql_string(country)})))
+      FILTER(LANG(?capitalLabel) = "en")
+    }}
+    LIMIT 1
+    """
+    
+    response = wikidata_get(
+        WIKIDATA_SPARQL_URL,
+        params={"query": query, "format": "json"},
+        retry=retry
+    )
+    
+    if response.status_code != 200:
+        return {"correct_answer": f"Could not find capital information for {country}", "confidence": 0.5}
+    
+    results = response.json().get("results", {}).get("bindings", [])
+    if not results:
+        return {"correct_answer": f"Could not find capital information for {country}", "confidence": 0.5}
+    
+    return cache_capital(country_key, country, claimed_capital, results[0]["capitalLabel"]["value"])
+
+def lookup_cached_capital(country_key, country, claimed_capital):
+    """
+    Compare the claim against the cached capital for the country, or return
+    None on a cache miss. The comparison runs on every hit so the answer
+    uses this caller's wording.
+    """
+    with CACHE_LOCK:
+        actual_capital = CAPITAL_CACHE.get(country_key)
+        if actual_capital is None:
+            CACHE_STATS["misses"] += 1
+            return None
+        CACHE_STATS["hits"] += 1
+    return compare_capital(country, claimed_capital, actual_capital)
+
+def cache_capital(country_key, country, claimed_capital, actual_capital):
+    """
+    Cache a capital fetched from Wikidata and compare the claim against it.
+    Only successful lookups are cached, so transient errors are retried on
+    the next request.
+    """
+    with CACHE_LOCK:
+        CAPITAL_CACHE[country_key] = actual_capital
+        LAST_KNOWN_CAPITALS[country_key] = actual_capital
+    return compare_capital(country, claimed_capital, actual_capital)
+
+def has_last_known_capital(country_key):
+    """Return True if a stale capital can answer for the country when Wikidata fails."""
+    with CACHE_LOCK:
+        return country_key in LAST_KNOWN_CAPITALS
+
+def stale_capital_result(country_key, country, claimed_capital):
+    """
+    Answer from the last capital fetched for the country, with reduced
+    confidence and a cached flag, or return None if there is none.
+    """
+    with CACHE_LOCK:
+        actual_capital = LAST_KNOWN_CAPITALS.get(country_key)
+    if actual_capital is None:
+        return None
+    result = compare_capital(country, claimed_capital, actual_capital)
+    result["confidence"] = STALE_CONFIDENCE
+    result["cached"] = True
+    return result
+
+def wikidata_get(url, params, retry=True):
+    """
+    GET from Wikidata through the shared session, logging the rate limit
+    budget. With retry=False a failure comes back at once, without backoff.
+    """
+    session = SESSION if retry else FAIL_FAST_SESSION
+    response = session.get(url, params=params, timeout=WIKIDATA_TIMEOUT)
+    remaining = response.headers.get("X-RateLimit-Remaining")
+    if remaining is not None:
+        app.logger.info("Wikidata rate limit remaining: %s", remaining)
+    return response
+
+def compare_capital(country, claimed_capital, actual_capital):
+    """Compare a claimed capital against the capital reported by Wikidata."""
+    # Normalize both sides for more accurate matching
+    normalized_actual_capital = normalize_capital_name(actual_capital)
+    normalized_claimed_capital = normalize_capital_name(claimed_capital)
+    
+    if fold_name(normalized_actual_capital) == fold_name(normalized_claimed_capital):
+        return {"correct_answer": f"Correct. The capital of {country} is {actual_capital}.", "confidence": 0.95}
+    else:
+        return {"correct_answer": f"Incorrect. The capital of {country} is {actual_capital}, not {claimed_capital}.", "confidence": 0.95}
+
+# SPARQL escape sequences (ECHAR) for characters that can't appear raw in a "..." literal
+SPARQL_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    '"': '\\"',
+    "\n": "\\n",
+    "\r": "\\r",
+    "\t": "\\t",
+    "\b": "\\b",
+    "\f": "\\f"
+})
+
+def sparql_string(value):
+    """Quote a value as a SPARQL string literal, escaping quotes, backslashes and control characters."""
+    return f'"{value.translate(SPARQL_ESCAPES)}"'
+
+def country_label_variants(country):
+    """
+    Return the English labels a country might have on Wikidata. Labels are
+    matched exactly, so include the title-cased form of lowercase input.
+    """
+    labels = {country, normalize_country_name(country), string.capwords(country)}
+    return sorted(labels)
+
+def check_capitals_batch(pairs):
+    """
+    Check a list of (country, claimed_capital) pairs.
+    Countries in the local database or the cache are answered directly,
+    and the rest share one SPARQL query using a VALUES block. Any country the batch
+    query doesn't resolve gets only the flexible CONTAINS search, since its
+    exact labels were just tried; those searches run concurrently and without
+    retries. If the batch query itself fails, pending claims get their last
+    known capital or an error instead, rather than each retrying Wikidata.
+    """
+    results = [None] * len(pairs)
+    pending = []
+    
+    for i, (country, claimed_capital) in enumerate(pairs):
+        if in_local_database(country):
+            results[i] = check_capital_claim(country, claimed_capital)
+            continue
         
-        # Compare normalized versions for more accurate matching
-        if normalized_actual_capital.lower() == normalized_claimed_capital.lower():
-            return {"correct_answer": f"Correct. The capital of {country} is {actual_capital}.", "confidence": 0.95}
+        country_key = fold_name(normalize_country_name(country))
+        cached = lookup_cached_capital(country_key, country, claimed_capital)
+        if cached is not None:
+            results[i] = cached
         else:
-            return {"correct_answer": f"Incorrect. The capital of {country} is {actual_capital}, not {claimed_capital}.", "confidence": 0.95}
-            
+            pending.append(i)
+    
+    if not pending:
+        return results
+    
+    found = {}
+    error = None
+    
+    try:
+        labels = set()
+        for i in pending:
+            labels.update(country_label_variants(pairs[i][0]))
+        values = " ".join(f"{sparql_string(label)}@en" for label in sorted(labels))
+    
+        query = f"""
+        SELECT ?countryLabel ?capitalLabel WHERE {{
+          VALUES ?countryLabel {{ {values} }}
+          ?country wdt:P31 wd:Q6256;  # instance of country
+                  rdfs:label ?countryLabel;
+                  wdt:P36 ?capital.   # capital
+          ?capital rdfs:label ?capitalLabel.
+          FILTER(LANG(?capitalLabel) = "en")
+        }}
+        """
+    
+        # Only retry when some country has no last known capital to fall back on
+        retry = not all(has_last_known_capital(fold_name(normalize_country_name(pairs[i][0]))) for i in pending)
+        response = wikidata_get(
+            WIKIDATA_SPARQL_URL,
+            params={"query": query, "format": "json"},
+            retry=retry
+        )
+    
+        if response.status_code == 200:
+            for binding in response.json().get("results", {}).get("bindings", []):
+                found.setdefault(fold_name(binding["countryLabel"]["value"]), binding["capitalLabel"]["value"])
+        else:
+            error = f"Error querying knowledge base: {response.status_code}"
+    except Exception as e:
+        error = f"Error checking fact: {str(e)}"
+    
+    unresolved = []
+    for i in pending:
+        country, claimed_capital = pairs[i]
+        country_key = fold_name(normalize_country_name(country))
+        actual_capital = found.get(country_key) or found.get(fold_name(country))
+        if actual_capital:
+            results[i] = cache_capital(country_key, country, claimed_capital, actual_capital)
+        elif error is not None:
+            stale = stale_capital_result(country_key, country, claimed_capital)
+            results[i] = stale if stale is not None else {"correct_answer": error, "confidence": 0.0}
+        else:
+            unresolved.append((i, country_key))
+    
+    if unresolved:
+        with ThreadPoolExecutor(max_workers=BATCH_FALLBACK_WORKERS) as executor:
+            checked = executor.map(lambda item: check_unresolved_capital(item[1], *pairs[item[0]]), unresolved)
+            for (i, _), result in zip(unresolved, checked):
+                results[i] = result
+    
+    return results
+
+def check_unresolved_capital(country_key, country, claimed_capital):
+    """
+    Run the CONTAINS search for a batch claim the VALUES query didn't resolve,
+    without retries, serving the last known capital if Wikidata fails.
+    """
+    try:
+        return check_capital_by_contains(country_key, country, claimed_capital, retry=False)
     except Exception as e:
+        stale = stale_capital_result(country_key, country, claimed_capital)
+        if stale is not None:
+            return stale
         return {"correct_answer": f"Error checking fact: {str(e)}", "confidence": 0.0}
 
 if __name__ == '__main__':
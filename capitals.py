@@ -0,0 +1,30 @@
+"""
+Offline capitals table shared by the fact-checking server and the MCP client.
+
+Kept free of Flask so the client can import it without the server's
+dependencies.
+"""
+
+import hashlib
+import json
+import os
+import unicodedata
+from types import MappingProxyType
+
+def fold_name(name: str) -> str:
+    """Case-fold a name and strip its accents, so "Reykjavik" matches "Reykjavík"."""
+    return "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c)).casefold()
+
+# Offline capitals table generated by scripts/build_capitals.py, stored as
+# folded country -> {folded capital: display capital}, with one entry per
+# capital for countries that have several
+CAPITALS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "capitals.json")
+with open(CAPITALS_PATH, "rb") as f:
+    _capitals_data = f.read()
+CAPITAL_DATABASE = MappingProxyType({
+    fold_name(country): {fold_name(capital): capital for capital in ([capitals] if isinstance(capitals, str) else capitals)}
+    for country, capitals in json.loads(_capitals_data).items()
+})
+# Changes whenever capitals.json does, so caches keyed on it can tell an
+# answer came from an older table
+CAPITALS_VERSION = hashlib.blake2b(_capitals_data, digest_size=8).hexdigest()
@@ -7,20 +7,125 @@ a fact-checking service with an LLM running on Ollama.
 """
 
 import argparse
-import json
-import re
+import asyncio
+import aiohttp
+import orjson
+import regex
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import sys
 import time
+from functools import lru_cache
 from typing import Dict, Any, Optional, List, Tuple
 
+from capitals import CAPITAL_DATABASE, fold_name
+
+try:
+    import hyperscan
+except ImportError:  # Optional: fall back to scanning with re
+    hyperscan = None
+
 # Configuration
 FACT_CHECKER_URL = "http://127.0.0.1:5000/fact-check"
+FACT_CHECKER_BATCH_URL = "http://127.0.0.1:5000/fact-check/batch"
 OLLAMA_API_URL = "http://127.0.0.1:11434/api/generate"
+BATCH_SIZE = 50  # Claims per batch request; larger sets are split and sent concurrently
 DEFAULT_MODEL = "llama3"  # Using llama3 as default model
+FACT_CHECK_TIMEOUT = 30  # Seconds to wait for a fact check request, including retries on the server
+
+# Same offline capitals table the server uses, so claims that are plainly
+# correct don't need a round-trip to the server
+LOCAL_CAPITALS = CAPITAL_DATABASE
+
+# Regular expression to detect potential factual claims about capitals.
+# Possessive whitespace, bounded lazy groups and a sentence-terminator
+# lookahead keep matching linear, so the capital can't run past the end of
+# its sentence or clause on long LLM outputs. Names are Unicode letters plus
+# apostrophes and hyphens ("Bogotá", "Port-au-Prince", "St. John's"). A
+# period doesn't end the capital after "St"/"Mt"-style abbreviations, and a
+# comma ends it unless it's the one in "Washington, D.C.".
+CAPITAL_CLAIM_PATTERN = regex.compile(
+    r"\b(?:the\s+capital(?:\s+city)?|capital\s+city)\s++of\s++"
+    r"(?P<country>[^\W\d_][\w\s'’-]{1,60}?)\s++is\s++"
+    r"(?P<capital>[^\W\d_][\w\s'’,.-]{1,80}?(?:(?<=\.[^\W\d_])\.)?)"  # keep the final dot of "D.C."
+    r"(?=[\n!?;]|(?<!\b(?:St|Ste|Mt|Ft))\.(?:\s|$)|,(?!\s*D\.?\s*C\b)|\s+(?:and|but)\b|$)",
+    regex.IGNORECASE
+)
+
+# Hyperscan only looks for the start of a claim; the pattern above does the rest.
+# One expression per prefix form: Hyperscan 0.9.1 crashes on a leading
+# alternation combined with HS_FLAG_SOM_LEFTMOST. The prefixes are compiled
+# in UTF-8/UCP mode so \s matches the same Unicode spaces ("\xa0") as the
+# pattern above. UCP mode doesn't support \b, so the prefilter may report a
+# start slightly early ("xthe capital of"); finditer's \b rejects those.
+CLAIM_PREFIX_EXPRESSIONS = [rb"the\s+capital(?:\s+city)?\s+of\s", rb"capital\s+city\s+of\s"]
+
+def build_claim_database() -> Optional[Any]:
+    """Compile the claim prefixes into a Hyperscan DFA, or return None if Hyperscan isn't installed"""
+    if hyperscan is None:
+        return None
+    database = hyperscan.Database()
+    database.compile(
+        expressions=CLAIM_PREFIX_EXPRESSIONS,
+        ids=list(range(len(CLAIM_PREFIX_EXPRESSIONS))),
+        flags=[
+            hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+        ] * len(CLAIM_PREFIX_EXPRESSIONS)
+    )
+    return database
+
+CLAIM_DATABASE = build_claim_database()
+
+def find_first_claim(text: str) -> Optional[int]:
+    """
+    Return the position of the first claim prefix in the text, found in one
+    linear Hyperscan pass, or None if the text contains no claims.
+    """
+    data = text.encode()
+    starts: List[int] = []
+    
+    def on_match(pattern_id, start, end, flags, context):
+        starts.append(start)
+        return True  # Stop at the first match
+    
+    try:
+        CLAIM_DATABASE.scan(data, match_event_handler=on_match)
+    except hyperscan.ScanTerminated:
+        pass
+    
+    if not starts:
+        return None
+    # Hyperscan reports byte offsets
+    return len(data[:starts[0]].decode())
 
-# Regular expression to detect potential factual claims about capitals
-CAPITAL_CLAIM_PATTERN = re.compile(r"(?:the capital of|capital city of) ([A-Za-z\s]+) is ([A-Za-z\s,\.]+)", re.IGNORECASE)
+@lru_cache(maxsize=1024)
+def detect_claims(text: str) -> Tuple[str, ...]:
+    """
+    Detect capital claims in the text. Memoized because detection is a pure
+    function of the text, so rescanning the same message or history window is
+    a dictionary hit.
+    """
+    # Find all matches for capital claims
+    start = 0
+    if CLAIM_DATABASE is not None:
+        # Hyperscan skips text without claims in a single SIMD pass
+        start = find_first_claim(text)
+        if start is None:
+            return ()
+    
+    return tuple(
+        f"The capital of {match.group('country').strip()} is {match.group('capital').strip()}"
+        for match in CAPITAL_CLAIM_PATTERN.finditer(text, start)
+    )
+
+def ollama_error(body: bytes) -> Optional[str]:
+    """Return the message from an Ollama {"error": ...} body, or None if it isn't one"""
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    return data.get("error") if isinstance(data, dict) else None
 
 class MCPClient:
     """Client for Model Context Protocol integration with Ollama"""
@@ -29,44 +134,128 @@ class MCPClient:
         self.model = model
         self.temperature = temperature
         self.conversation_history: List[Dict[str, str]] = []
+        # Keep-alive session for Ollama, so each chat turn reuses the connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": "FactCheckerMCP/1.0"})
+        # The aiohttp session is opened lazily on the client's own event loop,
+        # so its keep-alive connections survive across chat turns
+        self._loop = asyncio.new_event_loop()
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared aiohttp session, opening it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=FACT_CHECK_TIMEOUT),
+                json_serialize=lambda obj: orjson.dumps(obj).decode()
+            )
+        return self._session
+    
+    def close(self):
+        """Close the HTTP sessions and the client's event loop"""
+        self.session.close()
+        if self._session is not None and not self._session.closed:
+            self._loop.run_until_complete(self._session.close())
+        self._loop.close()
         
     def detect_factual_claims(self, text: str) -> List[str]:
         """Detect potential factual claims about capitals in the text"""
-        claims = []
-        
-        # Find all matches for capital claims
-        for match in CAPITAL_CLAIM_PATTERN.finditer(text):
-            country = match.group(1).strip()
-            city = match.group(2).strip()
-            claim = f"The capital of {country} is {city}"
-            claims.append(claim)
-            
-        return claims
+        return list(detect_claims(text))
+    
+    def _error_payload(self, claim: str, error: Exception) -> Dict[str, Any]:
+        """Build an MCP payload reporting a failed verification"""
+        return {
+            "version": "1.0",
+            "context": {
+                "type": "fact_check",
+                "claim": claim,
+                # Timeouts stringify to "", so fall back to the exception type
+                "correct_answer": f"Error verifying claim: {str(error) or type(error).__name__}",
+                "confidence": 0.0
+            }
+        }
+    
+    def verify_claim_locally(self, claim: str) -> Optional[Dict[str, Any]]:
+        """
+        Confirm a claim from the local capitals table. Returns an MCP payload
+        if the claim is correct, or None if the server needs to check it
+        (unknown country, alias, or a capital that doesn't match).
+        """
+        match = CAPITAL_CLAIM_PATTERN.match(claim)
+        if not match:
+            return None
+        country = match.group("country").strip()
+        city = match.group("capital").strip()
+        expected = LOCAL_CAPITALS.get(fold_name(country), {}).get(fold_name(city))
+        if expected is None:
+            return None
+        return {
+            "version": "1.0",
+            "context": {
+                "type": "fact_check",
+                "claim": claim,
+                "correct_answer": f"Correct. The capital of {country} is {expected}.",
+                "confidence": 0.95
+            }
+        }
     
     def verify_claim(self, claim: str) -> Dict[str, Any]:
         """Verify a claim using the Fact Checker MCP server"""
+        return self._loop.run_until_complete(self._verify_single(claim))
+    
+    async def _verify_single(self, claim: str) -> Dict[str, Any]:
+        """Verify one claim locally if possible, otherwise with a request to the MCP server"""
+        local_result = self.verify_claim_locally(claim)
+        if local_result is not None:
+            return local_result
         try:
-            response = requests.post(
-                FACT_CHECKER_URL,
-                json={"claim": claim},
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"Error verifying claim: {e}")
-            return {
-                "version": "1.0",
-                "context": {
-                    "type": "fact_check",
-                    "claim": claim,
-                    "correct_answer": f"Error verifying claim: {e}",
-                    "confidence": 0.0
-                }
-            }
+            session = await self._get_session()
+            async with session.post(FACT_CHECKER_URL, json={"claim": claim}) as response:
+                response.raise_for_status()
+                return await response.json(loads=orjson.loads)
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+            payload = self._error_payload(claim, e)
+            print(payload["context"]["correct_answer"])
+            return payload
+    
+    async def _verify_batch(self, claims: List[str]) -> List[Dict[str, Any]]:
+        """Verify several claims with a single request to the Fact Checker MCP server"""
+        try:
+            session = await self._get_session()
+            async with session.post(FACT_CHECKER_BATCH_URL, json={"claims": claims}) as response:
+                response.raise_for_status()
+                return await response.json(loads=orjson.loads)
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+            print(f"Error verifying claims: {str(e) or type(e).__name__}")
+            return [self._error_payload(claim, e) for claim in claims]
+    
+    async def verify_claims(self, claims: List[str]) -> List[Dict[str, Any]]:
+        """
+        Verify claims in batches of BATCH_SIZE, sending all batches concurrently.
+        Claims confirmed by the local capitals table are not sent at all.
+        """
+        results: List[Optional[Dict[str, Any]]] = [self.verify_claim_locally(claim) for claim in claims]
+        remote = [i for i, result in enumerate(results) if result is None]
+        
+        batches = [remote[i:i + BATCH_SIZE] for i in range(0, len(remote), BATCH_SIZE)]
+        batch_results = await asyncio.gather(
+            *(self._verify_batch([claims[i] for i in batch]) for batch in batches)
+        )
+        for batch, batch_result in zip(batches, batch_results):
+            for i, result in zip(batch, batch_result):
+                results[i] = result
+        return results
     
     def generate_llm_response(self, prompt: str, system_prompt: Optional[str] = None) -> Tuple[str, float]:
-        """Generate a response from Ollama LLM"""
+        """Generate a response from Ollama LLM, streaming it to stdout as it is generated"""
         messages = self.conversation_history.copy()
         
         if system_prompt:
@@ -75,19 +264,46 @@ class MCPClient:
         messages.append({"role": "user", "content": prompt})
         
         try:
-            response = requests.post(
+            # The with block returns the streamed connection to the pool even
+            # when we stop reading early or an error is raised mid-stream
+            with self.session.post(
                 OLLAMA_API_URL,
                 json={
                     "model": self.model,
                     "messages": messages,
-                    "stream": False,
+                    "stream": True,
                     "temperature": self.temperature
-                }
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result.get("response", ""), result.get("total_duration", 0) / 1000000000  # Convert ns to seconds
-        except requests.RequestException as e:
+                },
+                stream=True
+            ) as response:
+                if not response.ok:
+                    # Ollama explains HTTP errors (e.g. 404 for an unknown model) in an {"error": ...} body
+                    error = ollama_error(response.content)
+                    if error:
+                        print(f"Error from Ollama: {error}")
+                        return f"Error: {error}", 0
+                    response.raise_for_status()
+                
+                # Ollama streams one JSON object per line; print tokens as they arrive
+                text = []
+                total_duration = 0
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = orjson.loads(line)
+                    if "error" in chunk:
+                        # Failures after the stream has started arrive as a chunk
+                        print(f"\nError from Ollama: {chunk['error']}")
+                        return f"Error: {chunk['error']}", 0
+                    token = chunk.get("response", "")
+                    text.append(token)
+                    sys.stdout.write(token)
+                    sys.stdout.flush()
+                    if chunk.get("done"):
+                        total_duration = chunk.get("total_duration", 0)
+                print()
+                return "".join(text), total_duration / 1000000000  # Convert ns to seconds
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
             print(f"Error generating LLM response: {e}")
             return f"Error: {e}", 0
     
@@ -102,12 +318,10 @@ class MCPClient:
         if not claims:
             return prompt
         
-        # Verify each claim using the MCP server
-        fact_check_results = []
-        for claim in claims:
+        # Verify all claims with concurrent batch requests to the MCP server
+        fact_check_results = self._loop.run_until_complete(self.verify_claims(claims))
+        for claim, mcp_response in zip(claims, fact_check_results):
             print(f"Detected claim: {claim}")
-            mcp_response = self.verify_claim(claim)
-            fact_check_results.append(mcp_response)
             
             # Print the fact check result
             context = mcp_response.get("context", {})
@@ -158,11 +372,13 @@ class MCPClient:
                     fact_check_system += "\n" + verified_facts
                     
                     # Generate response with the augmented system prompt
+                    print("\nAssistant: ", end="", flush=True)
                     start_time = time.time()
                     response, duration = self.generate_llm_response(user_input, fact_check_system)
                     total_time = time.time() - start_time
                 else:
                     # No claims detected, use the original prompt
+                    print("\nAssistant: ", end="", flush=True)
                     start_time = time.time()
                     response, duration = self.generate_llm_response(user_input, system_prompt)
                     total_time = time.time() - start_time
@@ -170,8 +386,7 @@ class MCPClient:
                 # Add to conversation history
                 self.conversation_history.append({"role": "assistant", "content": response})
                 
-                # Print the response
-                print(f"\nAssistant: {response}")
+                # The response was streamed as it was generated
                 print(f"\n[Response time: {total_time:.2f}s, LLM processing: {duration:.2f}s]")
                 
             except KeyboardInterrupt:
@@ -196,7 +411,10 @@ If you're not sure about a fact, acknowledge your uncertainty."""
     
     # Create and run the MCP client
     client = MCPClient(model=args.model, temperature=args.temperature)
-    client.chat(system_prompt=system_prompt)
+    try:
+        client.chat(system_prompt=system_prompt)
+    finally:
+        client.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Build capitals.json - the offline country -> capital table used by app.py
+
+Runs a single SPARQL query against Wikidata for every sovereign state and its
+capitals, and writes the result keyed by case-folded English country name.
+Countries with one capital map to a string, countries with several (Bolivia,
+South Africa, ...) to a list of all of them.
+Re-run this when capitals change; the server only queries Wikidata for
+countries missing from the table.
+"""
+
+import json
+import os
+import sys
+
+import requests
+
+WIKIDATA_SPARQL_URL = "https://query.wikidata.org/sparql"
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "capitals.json")
+
+QUERY = """
+SELECT ?countryLabel ?capitalLabel WHERE {
+  ?country wdt:P31 wd:Q3624078;  # instance of sovereign state
+           wdt:P36 ?capital;     # capital
+           rdfs:label ?countryLabel.
+  ?capital rdfs:label ?capitalLabel.
+  FILTER(LANG(?countryLabel) = "en")
+  FILTER(LANG(?capitalLabel) = "en")
+}
+"""
+
+# Common names that differ from the Wikidata label, mapped to that label
+ALIASES = {
+    "united states": "united states of america",
+    "china": "people's republic of china",
+    "south korea": "republic of korea",
+    "north korea": "democratic people's republic of korea",
+    "czech republic": "czechia",
+    "east timor": "timor-leste",
+    "the bahamas": "bahamas",
+    "the gambia": "gambia",
+    "micronesia": "federated states of micronesia",
+    "sao tome and principe": "são tomé and príncipe"
+}
+
+def main():
+    response = requests.get(
+        WIKIDATA_SPARQL_URL,
+        params={"query": QUERY, "format": "json"},
+        headers={"User-Agent": "FactCheckerMCP/1.0"},
+        timeout=60
+    )
+    response.raise_for_status()
+
+    capitals = {}
+    for binding in response.json()["results"]["bindings"]:
+        names = capitals.setdefault(binding["countryLabel"]["value"].casefold(), [])
+        if binding["capitalLabel"]["value"] not in names:
+            names.append(binding["capitalLabel"]["value"])
+    capitals = {country: names[0] if len(names) == 1 else names for country, names in capitals.items()}
+
+    for alias, label in ALIASES.items():
+        if label in capitals:
+            capitals.setdefault(alias, capitals[label])
+
+    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(capitals.items())), f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+    print(f"Wrote {len(capitals)} capitals to {OUTPUT_PATH}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,48 @@
 import requests
 import json
+import orjson
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+FACT_CHECKER_URL = "http://127.0.0.1:5000/fact-check"
+
+# Shared session so every claim reuses the same keep-alive connection
+SESSION = requests.Session()
+
+def fetch_fact_check(claim, session=SESSION):
+    """Send a claim to the fact checker MCP server and return the parsed MCP response."""
+    response = session.post(FACT_CHECKER_URL, json={"claim": claim})
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+def print_fact_check(result):
+    """Print an MCP fact check response."""
+    print("\nMCP Response:")
+    print(json.dumps(result, indent=2))
+    
+    # Extract the relevant parts
+    context = result.get("context", {})
+    print("\nFact Check Result:")
+    print(f"Claim: {context.get('claim')}")
+    print(f"Correct Answer: {context.get('correct_answer')}")
+    print(f"Confidence: {context.get('confidence')}")
+    
+    # Determine if the claim was correct or incorrect
+    correct_answer = context.get('correct_answer', '')
+    if "Incorrect" in correct_answer:
+        print("Status: ❌ INCORRECT CLAIM")
+    elif "Correct" in correct_answer:
+        print("Status: ✅ CORRECT CLAIM")
+    else:
+        print("Status: ❓ UNKNOWN")
 
 def test_fact_checker(claim):
     """
     Test the fact checker MCP server with a given claim.
     """
-    url = "http://127.0.0.1:5000/fact-check"
-    payload = {"claim": claim}
-    
     try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        
-        result = response.json()
-        print("\nMCP Response:")
-        print(json.dumps(result, indent=2))
-        
-        # Extract the relevant parts
-        context = result.get("context", {})
-        print("\nFact Check Result:")
-        print(f"Claim: {context.get('claim')}")
-        print(f"Correct Answer: {context.get('correct_answer')}")
-        print(f"Confidence: {context.get('confidence')}")
-        
-        # Determine if the claim was correct or incorrect
-        correct_answer = context.get('correct_answer', '')
-        if "Incorrect" in correct_answer:
-            print("Status: ❌ INCORRECT CLAIM")
-        elif "Correct" in correct_answer:
-            print("Status: ✅ CORRECT CLAIM")
-        else:
-            print("Status: ❓ UNKNOWN")
-        
+        result = fetch_fact_check(claim)
+        print_fact_check(result)
         return result
         
     except requests.exceptions.RequestException as e:
@@ -74,35 +83,40 @@ def run_test_suite():
     print("=== RUNNING COMPREHENSIVE TEST SUITE ===")
     print(f"Testing {len(test_cases)} claims ({sum(1 for _, exp in test_cases if exp)} correct, {sum(1 for _, exp in test_cases if not exp)} incorrect)")
     
-    for i, (claim, expected_correct) in enumerate(test_cases):
-        print(f"\n[{i+1}/{len(test_cases)}] Testing: {claim}")
-        print(f"Expected: {'Correct' if expected_correct else 'Incorrect'}")
+    # Claims are independent, so send them in parallel over the shared session.
+    # The countries tested are all in the server's offline table, so there is
+    # no Wikidata rate limit to pace the requests for.
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = {
+            executor.submit(fetch_fact_check, claim): (i, claim, expected_correct)
+            for i, (claim, expected_correct) in enumerate(test_cases)
+        }
         
-        try:
-            result = test_fact_checker(claim)
-            if not result:
-                results["errors"] += 1
-                continue
-                
-            correct_answer = result.get("context", {}).get("correct_answer", "")
-            actual_correct = "Correct" in correct_answer
-            actual_incorrect = "Incorrect" in correct_answer
+        for future in as_completed(futures):
+            i, claim, expected_correct = futures[future]
+            print(f"\n[{i+1}/{len(test_cases)}] Testing: {claim}")
+            print(f"Expected: {'Correct' if expected_correct else 'Incorrect'}")
             
-            if (expected_correct and actual_correct) or (not expected_correct and actual_incorrect):
-                print("Test Result: ✅ PASS")
-                results["passed"] += 1
-            else:
-                print("Test Result: ❌ FAIL")
-                print(f"  Expected: {'Correct' if expected_correct else 'Incorrect'}")
-                print(f"  Actual: {correct_answer}")
-                results["failed"] += 1
+            try:
+                result = future.result()
+                print_fact_check(result)
                 
-            # Add a small delay to avoid overwhelming the Wikidata API
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"Error during test: {e}")
-            results["errors"] += 1
+                correct_answer = result.get("context", {}).get("correct_answer", "")
+                actual_correct = "Correct" in correct_answer
+                actual_incorrect = "Incorrect" in correct_answer
+                
+                if (expected_correct and actual_correct) or (not expected_correct and actual_incorrect):
+                    print("Test Result: ✅ PASS")
+                    results["passed"] += 1
+                else:
+                    print("Test Result: ❌ FAIL")
+                    print(f"  Expected: {'Correct' if expected_correct else 'Incorrect'}")
+                    print(f"  Actual: {correct_answer}")
+                    results["failed"] += 1
+                
+            except Exception as e:
+                print(f"Error during test: {e}")
+                results["errors"] += 1
     
     print("\n=== TEST SUMMARY ===")
     print(f"Total tests: {results['total']}")
@@ -134,5 +148,3 @@ if __name__ == "__main__":
         for claim in test_claims:
             print(f"\nTesting: {claim}")
             test_fact_checker(claim)
-            # Add a small delay to avoid overwhelming the Wikidata API
-            time.sleep(0.5)
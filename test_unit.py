@@ -1,14 +1,22 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 import json
+import hashlib
+import orjson
 import sys
+import time
 sys.path.append('.')
-from app import app, check_fact, check_capital_claim
+from app import app, normalize_country_name, normalize_capital_name, check_fact, check_capital_claim, check_capitals_batch, CAPITAL_CACHE, CACHE_STATS, LAST_KNOWN_CAPITALS, WIKIDATA_TIMEOUT, CLAIM_RE, CAPITALS_VERSION, sparql_string
+from mcp_client import MCPClient, detect_claims
 
 class TestFactCheckerMCP(unittest.TestCase):
     def setUp(self):
         self.app = app.test_client()
         self.app.testing = True
+        CAPITAL_CACHE.clear()
+        LAST_KNOWN_CAPITALS.clear()
+        CACHE_STATS.update(hits=0, misses=0)
     
     def test_missing_claim(self):
         """Test that the API returns an error when no claim is provided."""
@@ -42,6 +50,69 @@ class TestFactCheckerMCP(unittest.TestCase):
         self.assertIn('correct_answer', data['context'])
         self.assertIn('confidence', data['context'])
     
+    @patch('app.check_fact')
+    def test_cache_headers_and_not_modified(self, mock_check_fact):
+        """Test that confident answers carry an ETag that is honoured with a 304."""
+        mock_check_fact.return_value = {
+            "correct_answer": "Test answer",
+            "confidence": 0.95
+        }
+        
+        claim = "The capital of France is Paris"
+        response = self.app.post('/fact-check',
+                                json={"claim": claim})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+        
+        response = self.app.post('/fact-check',
+                                json={"claim": claim},
+                                headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(mock_check_fact.call_count, 1)
+        
+        # A wildcard matches any claim, so it is not honoured
+        response = self.app.post('/fact-check',
+                                json={"claim": claim},
+                                headers={"If-None-Match": "*"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_check_fact.call_count, 2)
+    
+    @patch('app.check_fact')
+    def test_no_not_modified_for_remote_claims(self, mock_check_fact):
+        """Test that claims needing Wikidata are always re-checked, even with a matching ETag."""
+        mock_check_fact.return_value = {
+            "correct_answer": "Test answer",
+            "confidence": 0.95
+        }
+        
+        response = self.app.post('/fact-check',
+                                json={"claim": "The capital of TestCountry is TestCity"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response.headers['Cache-Control'])
+        self.assertNotIn('ETag', response.headers)
+        
+        etag = hashlib.blake2b(f"{CAPITALS_VERSION}:The capital of TestCountry is TestCity".encode(), digest_size=8).hexdigest()
+        response = self.app.post('/fact-check',
+                                json={"claim": "The capital of TestCountry is TestCity"},
+                                headers={"If-None-Match": f'"{etag}"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_check_fact.call_count, 2)
+    
+    @patch('app.check_fact')
+    def test_no_cache_headers_for_low_confidence(self, mock_check_fact):
+        """Test that low-confidence answers are not marked cacheable."""
+        mock_check_fact.return_value = {
+            "correct_answer": "Unable to verify this claim",
+            "confidence": 0.0
+        }
+        
+        response = self.app.post('/fact-check',
+                                json={"claim": "Test claim"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+        self.assertNotIn('Cache-Control', response.headers)
+    
     def test_check_fact_capital_pattern(self):
         """Test that the capital pattern is correctly identified."""
         # Test with a valid capital claim
@@ -49,13 +120,86 @@ class TestFactCheckerMCP(unittest.TestCase):
         self.assertIn('correct_answer', result)
         self.assertIn('confidence', result)
     
+    @patch('app.check_capital_claim')
+    def test_check_fact_dispatches_capital_claim(self, mock_check_capital_claim):
+        """Test that a capital claim is dispatched with its country and capital."""
+        mock_check_capital_claim.return_value = {"correct_answer": "Test answer", "confidence": 0.9}
+        
+        result = check_fact("The capital of United States is Washington, D.C.")
+        mock_check_capital_claim.assert_called_once_with("United States", "Washington, D.C.")
+        self.assertEqual(result['correct_answer'], "Test answer")
+    
+    @patch('app.check_capital_claim')
+    def test_check_fact_trailing_period(self, mock_check_capital_claim):
+        """Test that a sentence-final period isn't taken as part of the capital."""
+        mock_check_capital_claim.return_value = {"correct_answer": "Test answer", "confidence": 0.9}
+        
+        check_fact("The capital of France is Paris.")
+        mock_check_capital_claim.assert_called_once_with("France", "Paris")
+    
+    def test_claim_pattern_is_linear(self):
+        """Test that pathological "... is ... is ..." input doesn't backtrack for ages."""
+        claim = "the capital of " + "a is " * 2000 + "#"
+        start = time.perf_counter()
+        self.assertIsNone(CLAIM_RE.match(claim))
+        self.assertLess(time.perf_counter() - start, 0.1)
+        
+        result = check_fact("The capital of France is " + "Paris " * 100)
+        self.assertEqual(result['correct_answer'], "Unable to verify this claim")
+    
+    def test_normalize_names(self):
+        """Test that aliases are normalized only when they are the whole name."""
+        self.assertEqual(normalize_country_name("USA"), "United States of America")
+        self.assertEqual(normalize_country_name("south KOREA"), "Republic of Korea")
+        self.assertEqual(normalize_country_name("US Virgin Islands"), "US Virgin Islands")
+        self.assertEqual(normalize_country_name("Cyprus"), "Cyprus")
+        self.assertEqual(normalize_capital_name("washington dc"), "Washington, D.C.")
+        self.assertEqual(normalize_capital_name("Paris"), "Paris")
+    
     def test_check_fact_unknown_pattern(self):
         """Test that unknown claim patterns return appropriate response."""
         result = check_fact("This is not a recognized claim pattern")
         self.assertEqual(result['correct_answer'], "Unable to verify this claim")
         self.assertEqual(result['confidence'], 0.0)
     
-    @patch('app.requests.get')
+    @patch('app.SESSION.get')
+    def test_check_capital_claim_local_case_insensitive(self, mock_get):
+        """Test that local database matches ignore case and don't query Wikidata."""
+        result = check_capital_claim("FRANCE", "paris")
+        self.assertIn("Correct", result['correct_answer'])
+        self.assertIn("Paris", result['correct_answer'])
+        mock_get.assert_not_called()
+    
+    @patch('app.SESSION.get')
+    def test_check_capital_claim_offline_table(self, mock_get):
+        """Test that any sovereign state in capitals.json is answered without Wikidata."""
+        result = check_capital_claim("Peru", "Cusco")
+        self.assertIn("Incorrect", result['correct_answer'])
+        self.assertIn("Lima", result['correct_answer'])
+        mock_get.assert_not_called()
+    
+    @patch('app.SESSION.get')
+    def test_check_capital_claim_any_of_several_capitals(self, mock_get):
+        """Test that every capital of a country with several is accepted."""
+        self.assertIn("Correct", check_capital_claim("Bolivia", "Sucre")['correct_answer'])
+        self.assertIn("Correct", check_capital_claim("Bolivia", "La Paz")['correct_answer'])
+        result = check_capital_claim("South Africa", "Johannesburg")
+        self.assertIn("Incorrect", result['correct_answer'])
+        self.assertIn("Pretoria or Cape Town or Bloemfontein", result['correct_answer'])
+        mock_get.assert_not_called()
+    
+    @patch('app.SESSION.get')
+    def test_check_fact_accents_and_punctuation(self, mock_get):
+        """Test that names with accents, hyphens and apostrophes parse and compare accent-insensitively."""
+        result = check_fact("The capital of Iceland is Reykjavik.")
+        self.assertEqual(result['correct_answer'], "Correct. The capital of Iceland is Reykjavík.")
+        self.assertIn("Correct", check_fact("The capital of Colombia is Bogotá")['correct_answer'])
+        self.assertIn("Correct", check_fact("The capital of Haiti is Port-au-Prince")['correct_answer'])
+        self.assertIn("Correct", check_fact("The capital of Antigua and Barbuda is St. John's")['correct_answer'])
+        self.assertIn("Correct", check_fact("The capital of São Tomé and Príncipe is Sao Tome")['correct_answer'])
+        mock_get.assert_not_called()
+    
+    @patch('app.SESSION.get')
     def test_check_capital_claim_correct(self, mock_get):
         """Test checking a correct capital claim."""
         # Mock the Wikidata API response
@@ -78,7 +222,7 @@ class TestFactCheckerMCP(unittest.TestCase):
         self.assertIn("Correct", result['correct_answer'])
         self.assertGreater(result['confidence'], 0.9)
     
-    @patch('app.requests.get')
+    @patch('app.SESSION.get')
     def test_check_capital_claim_incorrect(self, mock_get):
         """Test checking an incorrect capital claim."""
         # Mock the Wikidata API response
@@ -102,7 +246,7 @@ class TestFactCheckerMCP(unittest.TestCase):
         self.assertIn("RealCapital", result['correct_answer'])
         self.assertGreater(result['confidence'], 0.9)
     
-    @patch('app.requests.get')
+    @patch('app.SESSION.get')
     def test_check_capital_claim_api_error(self, mock_get):
         """Test handling of API errors."""
         # Mock an API error
@@ -113,8 +257,9 @@ class TestFactCheckerMCP(unittest.TestCase):
         result = check_capital_claim("TestCountry", "TestCity")
         self.assertIn("Error", result['correct_answer'])
         self.assertEqual(result['confidence'], 0.0)
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], WIKIDATA_TIMEOUT)
     
-    @patch('app.requests.get')
+    @patch('app.SESSION.get')
     def test_check_capital_claim_no_results(self, mock_get):
         """Test handling when no results are found."""
         # Mock empty results
@@ -131,5 +276,334 @@ class TestFactCheckerMCP(unittest.TestCase):
         self.assertIn("Could not find capital information", result['correct_answer'])
         self.assertEqual(result['confidence'], 0.5)
 
+    def test_batch_missing_claims(self):
+        """Test that the batch API returns an error when no claims list is provided."""
+        response = self.app.post('/fact-check/batch',
+                                json={"claim": "The capital of France is Paris"})
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertIn('error', data)
+    
+    @patch('app.check_facts_batch')
+    def test_batch_too_many_claims(self, mock_check_facts_batch):
+        """Test that the batch API rejects batches above the size limit."""
+        response = self.app.post('/fact-check/batch',
+                                json={"claims": ["The capital of France is Paris"] * 51})
+        self.assertEqual(response.status_code, 400)
+        mock_check_facts_batch.assert_not_called()
+    
+    @patch('app.check_facts_batch')
+    def test_batch_claim_format(self, mock_check_facts_batch):
+        """Test that the batch API returns one MCP payload per claim, in order."""
+        mock_check_facts_batch.return_value = [
+            {"correct_answer": "First answer", "confidence": 0.9},
+            {"correct_answer": "Second answer", "confidence": 0.5}
+        ]
+        
+        response = self.app.post('/fact-check/batch',
+                                json={"claims": ["First claim", "Second claim"]})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]['context']['claim'], 'First claim')
+        self.assertEqual(data[0]['context']['correct_answer'], 'First answer')
+        self.assertEqual(data[1]['context']['claim'], 'Second claim')
+        self.assertEqual(data[1]['context']['confidence'], 0.5)
+    
+    @patch('app.SESSION.get')
+    def test_check_capitals_batch_single_query(self, mock_get):
+        """Test that countries missing from the local database share one Wikidata query."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "results": {
+                "bindings": [
+                    {"countryLabel": {"value": "CountryA"}, "capitalLabel": {"value": "CityA"}},
+                    {"countryLabel": {"value": "CountryB"}, "capitalLabel": {"value": "CityB"}}
+                ]
+            }
+        }
+        mock_get.return_value = mock_response
+        
+        results = check_capitals_batch([
+            ("CountryA", "CityA"),
+            ("France", "Paris"),
+            ("CountryB", "WrongCity")
+        ])
+        
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn("Correct", results[0]['correct_answer'])
+        self.assertIn("Correct", results[1]['correct_answer'])
+        self.assertIn("Incorrect", results[2]['correct_answer'])
+        self.assertIn("CityB", results[2]['correct_answer'])
+
+    @patch('app.FAIL_FAST_SESSION.get')
+    @patch('app.SESSION.get')
+    def test_check_capitals_batch_misses_only_search_once(self, mock_get, mock_fail_fast_get):
+        """Test that countries the batch query misses get one CONTAINS search each, not a second exact query."""
+        empty_response = MagicMock()
+        empty_response.status_code = 200
+        empty_response.json.return_value = {"results": {"bindings": []}}
+        mock_get.return_value = empty_response
+        mock_fail_fast_get.return_value = empty_response
+        
+        results = check_capitals_batch([("Atlantis", "X"), ("Lemuria", "Y"), ("Mu", "Z")])
+        
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_fail_fast_get.call_count, 3)
+        for call in mock_fail_fast_get.call_args_list:
+            self.assertIn('CONTAINS', call.kwargs['params']['query'])
+        for result in results:
+            self.assertIn("Could not find", result['correct_answer'])
+        self.assertEqual(CACHE_STATS['misses'], 3)
+
+    @patch('app.SESSION.get')
+    def test_check_capital_claim_cached(self, mock_get):
+        """Test that repeat claims about a country are answered from the cache."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "results": {
+                "bindings": [
+                    {
+                        "capitalLabel": {
+                            "value": "TestCity"
+                        }
+                    }
+                ]
+            }
+        }
+        mock_get.return_value = mock_response
+        
+        check_capital_claim("TestCountry", "TestCity")
+        result = check_capital_claim("TestCountry", "OtherCity")
+        self.assertIn("Incorrect", result['correct_answer'])
+        self.assertIn("TestCity", result['correct_answer'])
+        # Hits are compared afresh, so the answer uses this caller's wording
+        result = check_capital_claim("testcountry", "testcity")
+        self.assertEqual(result['correct_answer'], "Correct. The capital of testcountry is TestCity.")
+        self.assertEqual(mock_get.call_count, 1)
+        
+        response = self.app.get('/cache/stats')
+        data = json.loads(response.data)
+        self.assertEqual(data['hits'], 2)
+        self.assertEqual(data['misses'], 1)
+        self.assertEqual(data['size'], 1)
+    
+    @patch('app.SESSION.get')
+    def test_check_capital_claim_error_not_cached(self, mock_get):
+        """Test that failed lookups are retried instead of being served from the cache."""
+        mock_response = MagicMock()
+        mock_response.status_code = 500
+        mock_get.return_value = mock_response
+        
+        check_capital_claim("TestCountry", "TestCity")
+        check_capital_claim("TestCountry", "TestCity")
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(len(CAPITAL_CACHE), 0)
+
+    @patch('app.SESSION.get')
+    def test_check_capital_claim_sparql_values_escaped(self, mock_get):
+        """Test that the SPARQL query binds escaped country labels through VALUES."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "results": {
+                "bindings": [
+                    {
+                        "capitalLabel": {
+                            "value": "TestCity"
+                        }
+                    }
+                ]
+            }
+        }
+        mock_get.return_value = mock_response
+        
+        check_capital_claim('Test"Country', "TestCity")
+        query = mock_get.call_args.kwargs['params']['query']
+        self.assertIn('VALUES ?countryLabel', query)
+        self.assertIn('"Test\\"Country"@en', query)
+        self.assertNotIn('LCASE', query)
+    
+    def test_sparql_string_escapes_control_characters(self):
+        """Test that line breaks and tabs can't end a SPARQL string literal early."""
+        self.assertEqual(sparql_string('a\\b"c'), '"a\\\\b\\"c"')
+        self.assertEqual(sparql_string("a\nb\rc\td"), '"a\\nb\\rc\\td"')
+
+    @patch('app.FAIL_FAST_SESSION.get')
+    @patch('app.SESSION.get')
+    def test_check_capital_claim_serves_stale_on_error(self, mock_get, mock_fail_fast_get):
+        """Test that the last known capital is served with lower confidence when Wikidata fails."""
+        ok_response = MagicMock()
+        ok_response.status_code = 200
+        ok_response.json.return_value = {
+            "results": {
+                "bindings": [
+                    {
+                        "capitalLabel": {
+                            "value": "TestCity"
+                        }
+                    }
+                ]
+            }
+        }
+        error_response = MagicMock()
+        error_response.status_code = 503
+        mock_get.return_value = ok_response
+        mock_fail_fast_get.return_value = error_response
+        
+        check_capital_claim("TestCountry", "TestCity")
+        # Simulate the TTL cache entry expiring
+        CAPITAL_CACHE.clear()
+        
+        response = self.app.post('/fact-check',
+                                json={"claim": "The capital of TestCountry is OtherCity"})
+        data = json.loads(response.data)
+        self.assertIn("Incorrect", data['context']['correct_answer'])
+        self.assertIn("TestCity", data['context']['correct_answer'])
+        self.assertEqual(data['context']['confidence'], 0.7)
+        self.assertTrue(data['context']['cached'])
+        self.assertNotIn('Cache-Control', response.headers)
+        # With a last known capital to fall back on, Wikidata isn't retried
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_fail_fast_get.call_count, 1)
+    
+    @patch('app.SESSION.get')
+    def test_check_capitals_batch_failure_not_retried_per_claim(self, mock_get):
+        """Test that a failed batch query doesn't fall back to one Wikidata query per claim."""
+        error_response = MagicMock()
+        error_response.status_code = 503
+        mock_get.return_value = error_response
+        
+        results = check_capitals_batch([("CountryA", "CityA"), ("CountryB", "CityB")])
+        self.assertEqual(mock_get.call_count, 1)
+        for result in results:
+            self.assertIn("Error", result['correct_answer'])
+            self.assertEqual(result['confidence'], 0.0)
+
+class TestMCPClient(unittest.TestCase):
+    def setUp(self):
+        self.client = MCPClient()
+    
+    def tearDown(self):
+        self.client.close()
+    
+    def test_detect_claims_terminators(self):
+        """Test that a claim's capital ends at sentence and clause boundaries."""
+        for text in ["The capital of France is Paris. It is big.",
+                     "The capital of France is Paris! Really.",
+                     "The capital of France is Paris; it is big.",
+                     "The capital of France is Paris, which is big.",
+                     "The capital of France is Paris\nNext line",
+                     "The capital of France is Paris but it is big"]:
+            self.assertEqual(detect_claims(text), ("The capital of France is Paris",), text)
+    
+    def test_detect_claims_multiple_per_sentence(self):
+        """Test that several claims in one sentence are detected separately."""
+        claims = detect_claims("The capital of France is Paris and the capital city of Italy is Rome, "
+                               "while capital city of Japan is Tokyo.")
+        self.assertEqual(claims, ("The capital of France is Paris",
+                                  "The capital of Italy is Rome",
+                                  "The capital of Japan is Tokyo"))
+    
+    def test_detect_claims_abbreviations_and_accents(self):
+        """Test that "Washington, D.C.", "St. John's" and accented names are kept whole."""
+        self.assertEqual(detect_claims("The capital of the USA is Washington, D.C. and it is big."),
+                         ("The capital of the USA is Washington, D.C.",))
+        self.assertEqual(detect_claims("The capital of Antigua and Barbuda is St. John's, I think."),
+                         ("The capital of Antigua and Barbuda is St. John's",))
+        self.assertEqual(detect_claims("The capital of Iceland is Reykjavík."),
+                         ("The capital of Iceland is Reykjavík",))
+    
+    def test_detect_claims_without_hyperscan(self):
+        """Test that the Hyperscan prefilter doesn't change which claims are found."""
+        # The first claim is separated by a no-break space, which Unicode \s matches
+        text = "Well, the\xa0capital of France is Paris. Also capital city of Japan is Tokyo!"
+        expected = ("The capital of France is Paris", "The capital of Japan is Tokyo")
+        detect_claims.cache_clear()
+        self.assertEqual(detect_claims(text), expected)
+        detect_claims.cache_clear()
+        with patch('mcp_client.CLAIM_DATABASE', None):
+            self.assertEqual(detect_claims(text), expected)
+        detect_claims.cache_clear()
+    
+    def test_detect_claims_memoized(self):
+        """Test that detecting claims in the same text twice is a cache hit."""
+        detect_claims.cache_clear()
+        first = self.client.detect_factual_claims("The capital of France is Paris.")
+        second = self.client.detect_factual_claims("The capital of France is Paris.")
+        self.assertEqual(first, second)
+        self.assertEqual(detect_claims.cache_info().hits, 1)
+    
+    def test_verify_claim_locally(self):
+        """Test that only claims confirmed by the local table skip the server."""
+        result = self.client.verify_claim_locally("The capital of Bolivia is La Paz")
+        self.assertEqual(result['context']['correct_answer'], "Correct. The capital of Bolivia is La Paz.")
+        self.assertIsNone(self.client.verify_claim_locally("The capital of France is Lyon"))
+        self.assertIsNone(self.client.verify_claim_locally("The capital of Testland is Testville"))
+        
+        with patch.object(self.client, '_get_session', AsyncMock()) as mock_get_session:
+            results = self.client._loop.run_until_complete(self.client.verify_claims(["The capital of Peru is Lima"]))
+        mock_get_session.assert_not_called()
+        self.assertIn("Correct", results[0]['context']['correct_answer'])
+    
+    def test_generate_llm_response_error_chunk(self):
+        """Test that an error reported in Ollama's stream is surfaced instead of an empty reply."""
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.ok = True
+        response.iter_lines.return_value = [b'{"response": "Par", "done": false}', b'{"error": "out of memory"}']
+        with patch.object(self.client.session, 'post', return_value=response):
+            text, duration = self.client.generate_llm_response("Hello")
+        self.assertEqual(text, "Error: out of memory")
+        self.assertEqual(duration, 0)
+        # The streamed response is closed even though the loop returned early
+        response.__exit__.assert_called_once()
+    
+    def test_generate_llm_response_http_error(self):
+        """Test that Ollama's message for an HTTP error (e.g. an unknown model) is surfaced."""
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.ok = False
+        response.status_code = 404
+        response.content = b'{"error": "model \'nope\' not found"}'
+        with patch.object(self.client.session, 'post', return_value=response):
+            text, duration = self.client.generate_llm_response("Hello")
+        self.assertEqual(text, "Error: model 'nope' not found")
+        response.raise_for_status.assert_not_called()
+        response.__exit__.assert_called_once()
+    
+    def test_generate_llm_response_invalid_json(self):
+        """Test that a malformed stream line becomes an error reply instead of raising."""
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.ok = True
+        response.iter_lines.return_value = [b'not json']
+        with patch.object(self.client.session, 'post', return_value=response):
+            text, duration = self.client.generate_llm_response("Hello")
+        self.assertTrue(text.startswith("Error:"))
+    
+    def test_verify_claim_timeout(self):
+        """Test that a timed out request becomes an error payload instead of raising."""
+        session = MagicMock()
+        session.post.return_value.__aenter__.side_effect = asyncio.TimeoutError()
+        with patch.object(self.client, '_get_session', AsyncMock(return_value=session)):
+            result = self.client.verify_claim("The capital of France is Lyon")
+            results = self.client._loop.run_until_complete(self.client.verify_claims(["The capital of France is Lyon"]))
+        self.assertEqual(result['context']['correct_answer'], "Error verifying claim: TimeoutError")
+        self.assertEqual(results[0]['context']['confidence'], 0.0)
+    
+    def test_verify_claims_invalid_json(self):
+        """Test that a malformed server response becomes an error payload instead of raising."""
+        session = MagicMock()
+        response = session.post.return_value.__aenter__.return_value
+        response.raise_for_status = MagicMock()
+        response.json = AsyncMock(side_effect=orjson.JSONDecodeError("bad", "x", 0))
+        with patch.object(self.client, '_get_session', AsyncMock(return_value=session)):
+            results = self.client._loop.run_until_complete(self.client.verify_claims(["The capital of France is Lyon"]))
+        self.assertIn("Error verifying claim", results[0]['context']['correct_answer'])
+
 if __name__ == '__main__':
     unittest.main()